@@ -6,7 +6,9 @@ Applicazione PyQt6 per creare file audio multi-traccia in formato .mybr
 
 import sys
 import os
+import copy
 import struct
+import time
 import wave
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
@@ -53,11 +55,18 @@ class AudioTrack:
             self.valid = False
 
 
+class MYBRCreationCancelled(Exception):
+    """Sollevata quando la creazione del file MYBR viene annullata dall'utente"""
+
+
 class MYBRFileCreator(QThread):
     """Thread per la creazione del file .mybr"""
     progress_updated = pyqtSignal(int, str)
+    bytes_progress = pyqtSignal('qint64', 'qint64') # byte scritti, byte totali
     finished_signal = pyqtSignal(bool, str)
 
+    CHUNK_SIZE = 1024 * 1024 # Dimensione dei blocchi copiati dai file WAV (1 MiB)
+
     def __init__(self, tracks: List[AudioTrack], output_path: str, 
                  loop_enabled: bool, loop_mode: str, 
                  loop_start_manual: int, loop_end_manual: int,
@@ -75,8 +84,20 @@ class MYBRFileCreator(QThread):
         self.loop_end_summative_mode = loop_end_summative_mode
         self.magic_number = 0x5242594D # 'MYBR'
 
+        # Statistiche del job, lette dalla GUI al termine
+        self.bytes_written = 0
+        self.total_bytes = 0
+        self.elapsed_seconds = 0.0
+        self.cancelled = False
+
+    def cancel(self):
+        """Richiede l'annullamento cooperativo della creazione"""
+        self.requestInterruption()
+
     def run(self):
         """Esegue la creazione del file MYBR"""
+        start_time = time.perf_counter()
+        output_created = False
         try:
             self.progress_updated.emit(0, "Inizio creazione file MYBR...")
 
@@ -112,76 +133,176 @@ class MYBRFileCreator(QThread):
                     # Assumiamo che il loop si riferisca alla durata della traccia principale (la prima)
                     raise ValueError(f"Loop End ({loop_end_sample}) non può superare la durata della prima traccia ({self.tracks[0].num_samples} campioni).")
 
+            # Calcola gli offset dei dati audio prima di aprire l'output,
+            # così da conoscere la dimensione finale del file
+            header_size = 4 + 1 + 1 + 4 + 4 # Global Header size
+            
+            # Dimensione di tutti i Track Headers
+            track_headers_size = 0
+            for track in self.tracks:
+                # channels (1) + sample_rate (4) + num_samples (4) + name_length (1) + name (N) + offset_to_data (4)
+                track_headers_size += (1 + 4 + 4 + 1 + len(track.name.encode('utf-8')) + 4)
+
+            current_offset = header_size + track_headers_size
+            track_data_offsets = []
+            
+            for i, track in enumerate(self.tracks):
+                self._check_cancelled()
+                wav_data_size = self._get_wav_data_size(track.file_path)
+                track_data_offsets.append(current_offset)
+                current_offset += wav_data_size
+
+            self.total_bytes = current_offset
+            self.bytes_written = 0
+
+            self._check_cancelled()
+            output_created = True
             with open(self.output_path, 'wb') as output_file:
                 # 1. Scrittura Global Header
                 # Magic Number (4 bytes)
-                output_file.write(struct.pack('<I', self.magic_number))
+                self._write(output_file, struct.pack('<I', self.magic_number))
                 # Numero di tracce (1 byte)
-                output_file.write(struct.pack('<B', len(self.tracks)))
+                self._write(output_file, struct.pack('<B', len(self.tracks)))
                 # Loop abilitato (1 byte)
-                output_file.write(struct.pack('<B', 1 if self.loop_enabled else 0))
+                self._write(output_file, struct.pack('<B', 1 if self.loop_enabled else 0))
                 # Loop Start Sample (4 bytes)
-                output_file.write(struct.pack('<I', loop_start_sample))
+                self._write(output_file, struct.pack('<I', loop_start_sample))
                 # Loop End Sample (4 bytes)
-                output_file.write(struct.pack('<I', loop_end_sample))
-
-                # Calcola gli offset dei dati audio
-                header_size = 4 + 1 + 1 + 4 + 4 # Global Header size
-                
-                # Dimensione di tutti i Track Headers
-                track_headers_size = 0
-                for track in self.tracks:
-                    # channels (1) + sample_rate (4) + num_samples (4) + name_length (1) + name (N) + offset_to_data (4)
-                    track_headers_size += (1 + 4 + 4 + 1 + len(track.name.encode('utf-8')) + 4)
-
-                current_offset = header_size + track_headers_size
-                track_data_offsets = []
-                
-                for i, track in enumerate(self.tracks):
-                    wav_data_size = self._get_wav_data_size(track.file_path)
-                    track_data_offsets.append(current_offset)
-                    current_offset += wav_data_size
-                    self.progress_updated.emit(int((i / len(self.tracks)) * 50), f"Calcolo offset traccia {i+1}/{len(self.tracks)}")
+                self._write(output_file, struct.pack('<I', loop_end_sample))
 
                 # 2. Scrittura Track Headers
                 for i, track in enumerate(self.tracks):
                     # Canali (1 byte)
-                    output_file.write(struct.pack('<B', track.channels))
+                    self._write(output_file, struct.pack('<B', track.channels))
                     # Sample Rate (4 bytes)
-                    output_file.write(struct.pack('<I', track.sample_rate))
+                    self._write(output_file, struct.pack('<I', track.sample_rate))
                     # Numero Campioni (4 bytes)
-                    output_file.write(struct.pack('<I', track.num_samples))
+                    self._write(output_file, struct.pack('<I', track.num_samples))
                     
                     # Nome Traccia (lunghezza 1 byte, poi stringa UTF-8)
                     name_bytes = track.name.encode('utf-8')
                     if len(name_bytes) > 255:
                         raise ValueError(f"Nome traccia '{track.name}' troppo lungo (max 255 bytes UTF-8).")
-                    output_file.write(struct.pack('<B', len(name_bytes)))
-                    output_file.write(name_bytes)
+                    self._write(output_file, struct.pack('<B', len(name_bytes)))
+                    self._write(output_file, name_bytes)
 
                     # Offset ai dati audio (4 bytes)
-                    output_file.write(struct.pack('<I', track_data_offsets[i]))
-                    self.progress_updated.emit(50 + int((i / len(self.tracks)) * 25), f"Scrittura header traccia {i+1}/{len(self.tracks)}")
-
+                    self._write(output_file, struct.pack('<I', track_data_offsets[i]))
+                self._emit_progress("Scrittura header tracce completata")
 
                 # 3. Scrittura Dati Audio
                 for i, track in enumerate(self.tracks):
-                    self._write_wav_data(track.file_path, output_file)
-                    self.progress_updated.emit(75 + int((i / len(self.tracks)) * 25), f"Scrittura dati traccia {i+1}/{len(self.tracks)}")
+                    self._write_wav_data(track.file_path, output_file,
+                                         f"Scrittura dati traccia {i+1}/{len(self.tracks)}")
 
+            self.elapsed_seconds = time.perf_counter() - start_time
             self.finished_signal.emit(True, f"File MYBR creato con successo: {self.output_path}")
 
+        except MYBRCreationCancelled:
+            self.cancelled = True
+            self.elapsed_seconds = time.perf_counter() - start_time
+            if output_created:
+                self._remove_partial_output()
+            self.finished_signal.emit(False, "Creazione annullata.")
+
         except Exception as e:
+            self.elapsed_seconds = time.perf_counter() - start_time
+            if output_created:
+                self._remove_partial_output()
             self.finished_signal.emit(False, f"Errore durante la creazione del file MYBR: {e}")
 
+    def _check_cancelled(self):
+        """Interrompe la creazione se è stato richiesto l'annullamento"""
+        if self.isInterruptionRequested():
+            raise MYBRCreationCancelled()
+
+    def _write(self, output_file, data: bytes):
+        """Scrive dati nell'output aggiornando il conteggio dei byte scritti"""
+        output_file.write(data)
+        self.bytes_written += len(data)
+
+    def _emit_progress(self, message: str):
+        """Notifica il progresso in byte e in percentuale"""
+        self.bytes_progress.emit(self.bytes_written, self.total_bytes)
+        percent = int(self.bytes_written * 100 / self.total_bytes) if self.total_bytes else 0
+        self.progress_updated.emit(percent, message)
+
+    def _remove_partial_output(self):
+        """Elimina il file di output incompleto"""
+        try:
+            os.remove(self.output_path)
+        except OSError:
+            pass
+
     def _get_wav_data_size(self, wav_path: str) -> int:
         """Restituisce la dimensione in byte del file WAV completo."""
         return os.path.getsize(wav_path)
 
-    def _write_wav_data(self, wav_path: str, output_file):
-        """Scrive il contenuto binario di un file WAV nell'output."""
+    def _write_wav_data(self, wav_path: str, output_file, message: str):
+        """Scrive il contenuto binario di un file WAV nell'output, a blocchi."""
         with open(wav_path, 'rb') as wav_file:
-            output_file.write(wav_file.read())
+            while True:
+                self._check_cancelled()
+                chunk = wav_file.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                self._write(output_file, chunk)
+                self._emit_progress(message)
+
+
+class MYBRBuildJob:
+    """Rappresenta un job di creazione MYBR nella coda, con la sua configurazione e il suo stato"""
+    STATUS_QUEUED = "In coda"
+    STATUS_RUNNING = "In corso"
+    STATUS_DONE = "Completato"
+    STATUS_CANCELLED = "Annullato"
+    STATUS_FAILED = "Errore"
+
+    def __init__(self, tracks: List[AudioTrack], output_path: str,
+                 loop_enabled: bool, loop_mode: str,
+                 loop_start_manual: int, loop_end_manual: int,
+                 loop_start_file_path: Optional[str], loop_end_file_path: Optional[str],
+                 loop_end_summative_mode: bool):
+        # Copia le tracce: la GUI può modificarle (es. rinominarle) mentre il job è in coda
+        self.tracks = [copy.copy(track) for track in tracks]
+        self.output_path = output_path
+        self.loop_enabled = loop_enabled
+        self.loop_mode = loop_mode
+        self.loop_start_manual = loop_start_manual
+        self.loop_end_manual = loop_end_manual
+        self.loop_start_file_path = loop_start_file_path
+        self.loop_end_file_path = loop_end_file_path
+        self.loop_end_summative_mode = loop_end_summative_mode
+        self.status = self.STATUS_QUEUED
+        self.message = ""
+        self.thread: Optional[MYBRFileCreator] = None
+
+    @property
+    def is_active(self) -> bool:
+        """True se il job è in coda o in esecuzione"""
+        return self.status in (self.STATUS_QUEUED, self.STATUS_RUNNING)
+
+    def create_thread(self) -> MYBRFileCreator:
+        """Crea il thread di creazione con la configurazione del job"""
+        self.thread = MYBRFileCreator(
+            self.tracks,
+            self.output_path,
+            self.loop_enabled,
+            self.loop_mode,
+            self.loop_start_manual,
+            self.loop_end_manual,
+            self.loop_start_file_path,
+            self.loop_end_file_path,
+            self.loop_end_summative_mode
+        )
+        return self.thread
+
+    def throughput_text(self) -> str:
+        """Restituisce il throughput del job in formato leggibile"""
+        if not self.thread or self.thread.elapsed_seconds <= 0:
+            return ""
+        mb_per_second = self.thread.bytes_written / self.thread.elapsed_seconds / (1024 * 1024)
+        return f"{mb_per_second:.1f} MB/s ({self.thread.elapsed_seconds:.1f} s)"
 
 
 class MYBRCreatorMainWindow(QMainWindow):
@@ -189,13 +310,13 @@ class MYBRCreatorMainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.tracks: List[AudioTrack] = []
-        self.creator_thread: Optional[MYBRFileCreator] = None
+        self.jobs: List[MYBRBuildJob] = []
         self.init_ui()
 
     def init_ui(self):
         """Inizializza l'interfaccia utente"""
         self.setWindowTitle("MYBR Creator")
-        self.setGeometry(100, 100, 800, 700)
+        self.setGeometry(100, 100, 800, 900)
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -317,20 +438,48 @@ class MYBRCreatorMainWindow(QMainWindow):
         output_path_layout.addWidget(self.browse_output_btn)
         output_layout.addLayout(output_path_layout)
         
-        self.create_btn = QPushButton("Crea File MYBR")
+        self.create_btn = QPushButton("Aggiungi alla Coda")
         self.create_btn.clicked.connect(self.create_mybr_file)
         output_layout.addWidget(self.create_btn)
 
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setVisible(False)
-        self.progress_bar.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        output_layout.addWidget(self.progress_bar)
+        main_layout.addWidget(output_group)
+
+        # Gruppo coda di creazione
+        queue_group = QGroupBox("Coda di Creazione")
+        queue_layout = QVBoxLayout(queue_group)
+
+        parallel_layout = QHBoxLayout()
+        parallel_layout.addWidget(QLabel("Job in parallelo:"))
+        self.parallel_jobs_spin = QSpinBox()
+        self.parallel_jobs_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.parallel_jobs_spin.setValue(min(2, self.parallel_jobs_spin.maximum()))
+        self.parallel_jobs_spin.valueChanged.connect(self.start_pending_jobs)
+        parallel_layout.addWidget(self.parallel_jobs_spin)
+        parallel_layout.addStretch(1)
+        queue_layout.addLayout(parallel_layout)
+
+        self.job_table = QTableWidget()
+        self.job_table.setColumnCount(5)
+        self.job_table.setHorizontalHeaderLabels(["File Output", "Tracce", "Stato", "Progresso", "Throughput"])
+        self.job_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.job_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.job_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        queue_layout.addWidget(self.job_table)
+
+        job_buttons_layout = QHBoxLayout()
+        self.cancel_job_btn = QPushButton("Annulla Job Selezionati")
+        self.cancel_job_btn.clicked.connect(self.cancel_selected_jobs)
+        self.clear_jobs_btn = QPushButton("Rimuovi Job Terminati")
+        self.clear_jobs_btn.clicked.connect(self.clear_finished_jobs)
+        job_buttons_layout.addWidget(self.cancel_job_btn)
+        job_buttons_layout.addWidget(self.clear_jobs_btn)
+        queue_layout.addLayout(job_buttons_layout)
 
         self.status_label = QLabel("Pronto")
         self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        output_layout.addWidget(self.status_label)
+        queue_layout.addWidget(self.status_label)
 
-        main_layout.addWidget(output_group)
+        main_layout.addWidget(queue_group)
         main_layout.addStretch(1)
 
     def set_dark_theme(self):
@@ -558,7 +707,7 @@ class MYBRCreatorMainWindow(QMainWindow):
             self.output_path_edit.setText(file_path)
 
     def create_mybr_file(self):
-        """Avvia la creazione del file MYBR in un thread separato"""
+        """Aggiunge alla coda un job di creazione del file MYBR con la configurazione corrente"""
         if not self.tracks:
             QMessageBox.warning(self, "Attenzione", "Aggiungere almeno una traccia audio prima di creare il file MYBR.")
             return
@@ -591,12 +740,12 @@ class MYBRCreatorMainWindow(QMainWindow):
                     return
                 # Ulteriore validazione dei file WAV avverrà nel thread per evitare blocchi UI
         
-        self.create_btn.setEnabled(False)
-        self.progress_bar.setValue(0)
-        self.progress_bar.setVisible(True)
-        self.status_label.setText("In creazione...")
+        for job in self.jobs:
+            if job.is_active and os.path.abspath(job.output_path) == os.path.abspath(output_path):
+                QMessageBox.warning(self, "Percorso Output", f"Un job in coda sta già scrivendo su '{output_path}'.")
+                return
 
-        self.creator_thread = MYBRFileCreator(
+        job = MYBRBuildJob(
             self.tracks,
             output_path,
             loop_enabled,
@@ -607,28 +756,126 @@ class MYBRCreatorMainWindow(QMainWindow):
             loop_end_file_path,
             loop_end_summative_mode
         )
-        
-        self.creator_thread.progress_updated.connect(self.on_progress_updated)
-        self.creator_thread.finished_signal.connect(self.on_creation_finished)
-        self.creator_thread.start()
-    
-    def on_progress_updated(self, value: int, message: str):
-        """Aggiorna il progresso"""
-        self.progress_bar.setValue(value)
-        self.status_label.setText(message)
-    
-    def on_creation_finished(self, success: bool, message: str):
-        """Gestisce il completamento della creazione"""
-        self.create_btn.setEnabled(True)
-        self.progress_bar.setVisible(False)
-        self.status_label.setText(message)
-        
+        self.jobs.append(job)
+        self.update_job_table()
+        self.start_pending_jobs()
+
+    def start_pending_jobs(self):
+        """Avvia i job in coda fino al numero massimo di job paralleli"""
+        running = sum(1 for job in self.jobs if job.status == MYBRBuildJob.STATUS_RUNNING)
+        for job in self.jobs:
+            if running >= self.parallel_jobs_spin.value():
+                break
+            if job.status != MYBRBuildJob.STATUS_QUEUED:
+                continue
+
+            thread = job.create_thread()
+            thread.bytes_progress.connect(lambda done, total, job=job: self.on_job_bytes_progress(job, done, total))
+            thread.progress_updated.connect(lambda value, message, job=job: self.on_job_progress_updated(job, value, message))
+            thread.finished_signal.connect(lambda success, message, job=job: self.on_job_finished(job, success, message))
+            job.status = MYBRBuildJob.STATUS_RUNNING
+            thread.start()
+            running += 1
+            self.update_job_row(job)
+        self.update_queue_status()
+
+    def update_job_table(self):
+        """Ricostruisce la tabella dei job"""
+        self.job_table.setRowCount(len(self.jobs))
+        for i, job in enumerate(self.jobs):
+            self.job_table.setItem(i, 0, QTableWidgetItem(job.output_path))
+            self.job_table.setItem(i, 1, QTableWidgetItem(str(len(job.tracks))))
+            self.job_table.setItem(i, 2, QTableWidgetItem())
+            progress_bar = QProgressBar()
+            progress_bar.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.job_table.setCellWidget(i, 3, progress_bar)
+            self.job_table.setItem(i, 4, QTableWidgetItem())
+            self.update_job_row(job)
+        self.update_queue_status()
+
+    def update_job_row(self, job: MYBRBuildJob):
+        """Aggiorna stato e throughput di un job nella tabella"""
+        row = self.jobs.index(job)
+        status_item = self.job_table.item(row, 2)
+        status_item.setText(job.status)
+        status_item.setToolTip(job.message)
+        if job.status == MYBRBuildJob.STATUS_DONE:
+            self.job_table.item(row, 4).setText(job.throughput_text())
+            self.job_table.cellWidget(row, 3).setValue(100)
+
+    def update_queue_status(self):
+        """Aggiorna l'etichetta di riepilogo della coda"""
+        running = sum(1 for job in self.jobs if job.status == MYBRBuildJob.STATUS_RUNNING)
+        queued = sum(1 for job in self.jobs if job.status == MYBRBuildJob.STATUS_QUEUED)
+        if running or queued:
+            self.status_label.setText(f"{running} job in corso, {queued} in coda")
+        else:
+            self.status_label.setText("Pronto")
+
+    def on_job_bytes_progress(self, job: MYBRBuildJob, bytes_written: int, total_bytes: int):
+        """Aggiorna la barra di progresso di un job in base ai byte scritti"""
+        if job not in self.jobs:
+            return
+        progress_bar = self.job_table.cellWidget(self.jobs.index(job), 3)
+        percent = int(bytes_written * 100 / total_bytes) if total_bytes else 0
+        progress_bar.setValue(percent)
+        progress_bar.setFormat(f"{percent}% ({bytes_written / (1024 * 1024):.1f}/{total_bytes / (1024 * 1024):.1f} MB)")
+
+    def on_job_progress_updated(self, job: MYBRBuildJob, value: int, message: str):
+        """Aggiorna il messaggio di stato di un job"""
+        if job not in self.jobs:
+            return
+        job.message = message
+        self.job_table.item(self.jobs.index(job), 2).setToolTip(message)
+
+    def on_job_finished(self, job: MYBRBuildJob, success: bool, message: str):
+        """Gestisce il completamento di un job e avvia i successivi in coda"""
+        job.message = message
         if success:
-            QMessageBox.information(self, "Successo", message)
+            job.status = MYBRBuildJob.STATUS_DONE
+        elif job.thread.cancelled:
+            job.status = MYBRBuildJob.STATUS_CANCELLED
         else:
-            QMessageBox.critical(self, "Errore", message)
-        
-        self.creator_thread = None
+            job.status = MYBRBuildJob.STATUS_FAILED
+        if job in self.jobs:
+            self.update_job_row(job)
+        self.start_pending_jobs()
+
+    def cancel_selected_jobs(self):
+        """Annulla i job selezionati, in coda o in esecuzione"""
+        selected_rows = self.job_table.selectionModel().selectedRows()
+        if not selected_rows:
+            QMessageBox.warning(self, "Nessuna selezione", "Seleziona uno o più job da annullare.")
+            return
+
+        for index in selected_rows:
+            job = self.jobs[index.row()]
+            if job.status == MYBRBuildJob.STATUS_QUEUED:
+                job.status = MYBRBuildJob.STATUS_CANCELLED
+                job.message = "Annullato prima dell'avvio."
+                self.update_job_row(job)
+            elif job.status == MYBRBuildJob.STATUS_RUNNING:
+                # Il job passerà ad "Annullato" quando il thread avrà ripulito l'output parziale
+                job.thread.cancel()
+        self.update_queue_status()
+
+    def clear_finished_jobs(self):
+        """Rimuove dalla coda i job terminati"""
+        for job in self.jobs:
+            if not job.is_active and job.thread:
+                job.thread.wait()
+        self.jobs = [job for job in self.jobs if job.is_active]
+        self.update_job_table()
+
+    def closeEvent(self, event):
+        """Annulla i job in esecuzione prima di chiudere la finestra"""
+        for job in self.jobs:
+            if job.status == MYBRBuildJob.STATUS_RUNNING:
+                job.thread.cancel()
+        for job in self.jobs:
+            if job.thread:
+                job.thread.wait()
+        super().closeEvent(event)
 
 
 def main():